@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Gerador de padrões pré-compilados
+Escreve patterns_compiled.py com cada regex como constante de módulo,
+no espírito dos source-generated regex do .NET: os padrões são fixos
+no build, então não há motivo para montá-los de novo a cada processo.
+
+Uso: python gen_patterns.py  (roda no build da imagem)
+"""
+
+import re
+import sys
+from pathlib import Path
+
+from patterns import SecurityPatterns
+
+HEADER = '''"""
+Padrões pré-compilados — GERADO por gen_patterns.py, não editar à mão.
+Regenerar com: python gen_patterns.py
+"""
+
+import re
+
+FINGERPRINT = {fingerprint!r}
+
+REGISTRY = {{
+'''
+
+def generate() -> str:
+    lines = [HEADER.format(fingerprint=SecurityPatterns.fingerprint())]
+
+    for name, config in SecurityPatterns.get_all_patterns().items():
+        regex, flags = SecurityPatterns._split_inline_flags(config['regex'])
+        flags_src = ', re.IGNORECASE' if flags & re.IGNORECASE else ''
+        lines.append(f"    {name!r}: (re.compile({regex!r}{flags_src}), {config!r}),\n")
+    lines.append('}\n\n')
+
+    combined, _ = SecurityPatterns.get_combined_pattern()
+    lines.append(f'COMBINED = re.compile({combined.pattern!r})\n')
+
+    return ''.join(lines)
+
+def main():
+    out_path = Path(__file__).parent / 'patterns_compiled.py'
+    out_path.write_text(generate(), encoding='utf-8')
+    print(f"[gen_patterns] Wrote {out_path}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -11,7 +11,7 @@ import argparse
 from scanner import SecurityScanner
 from discord_reporter import DiscordReporter
 
-def run_audit(scan_path: str, discord_webhook: str) -> int:
+def run_audit(scan_path: str, discord_webhook: str, fail_fast: bool = False) -> int:
     """Executa auditoria completa"""
     print("=" * 60)
     print("🛡️  ULFBERHT SECURITY AUDITOR")
@@ -22,7 +22,7 @@ def run_audit(scan_path: str, discord_webhook: str) -> int:
 
     try:
         # Inicializa scanner
-        scanner = SecurityScanner(root_path=scan_path)
+        scanner = SecurityScanner(root_path=scan_path, fail_fast=fail_fast)
 
         # Executa scan
         violations = scanner.run_full_audit()
@@ -40,9 +40,10 @@ def run_audit(scan_path: str, discord_webhook: str) -> int:
         print("📊 AUDIT SUMMARY")
         print(f"{'='*60}")
 
-        by_severity = scanner.get_violations_by_severity()
+        # Contagens O(1) dos buckets mantidos durante a coleta
+        counts = scanner.violations.severity_counts()
         for severity in ['critical', 'high', 'medium', 'low']:
-            count = len(by_severity[severity])
+            count = counts[severity]
             if count > 0:
                 print(f"  {severity.upper():8} : {count} violations")
 
@@ -51,13 +52,13 @@ def run_audit(scan_path: str, discord_webhook: str) -> int:
         print(f"{'='*60}\n")
 
         # Exit code baseado em violações
-        if by_severity['critical']:
+        if counts['critical']:
             print("❌ CRITICAL violations found. Exiting with code 2.")
             return 2
-        elif by_severity['high']:
+        elif counts['high']:
             print("⚠️  HIGH violations found. Exiting with code 1.")
             return 1
-        elif violations:
+        elif total:
             print("ℹ️  Violations found but not critical. Exiting with code 0.")
             return 0
         else:
@@ -70,12 +71,13 @@ def run_audit(scan_path: str, discord_webhook: str) -> int:
         traceback.print_exc()
         return 3
 
-def watch_mode(scan_path: str, discord_webhook: str, interval: int = 1800):
+def watch_mode(scan_path: str, discord_webhook: str, interval: int = 1800,
+               fail_fast: bool = False):
     """Modo watch - executa auditoria periodicamente"""
     print(f"[Watch] Starting watch mode (interval: {interval}s)")
 
     while True:
-        run_audit(scan_path, discord_webhook)
+        run_audit(scan_path, discord_webhook, fail_fast)
         print(f"\n[Watch] Sleeping for {interval} seconds...")
         time.sleep(interval)
 
@@ -115,6 +117,12 @@ def main():
         help='Run audit once and exit'
     )
 
+    parser.add_argument(
+        '--fail-fast',
+        action='store_true',
+        help='Stop scanning at the first critical violation'
+    )
+
     args = parser.parse_args()
 
     # Validações
@@ -125,9 +133,9 @@ def main():
 
     # Executa
     if args.watch:
-        watch_mode(args.path, args.webhook, args.interval)
+        watch_mode(args.path, args.webhook, args.interval, args.fail_fast)
     else:
-        exit_code = run_audit(args.path, args.webhook)
+        exit_code = run_audit(args.path, args.webhook, args.fail_fast)
         sys.exit(exit_code)
 
 if __name__ == '__main__':
@@ -3,10 +3,80 @@ Security Audit Patterns
 Detecta dados sensíveis específicos para CloudWalk/InfinitePay
 """
 
+import hashlib
+import os
 import re
+from array import array
+from functools import lru_cache
 from typing import Dict, List, Tuple
 from dataclasses import dataclass
 
+# Engine opcional com matching linear-time (sem backtracking).
+# google-re2 garante O(n) mesmo em input malicioso; o re padrão
+# usa NFA com backtracking e fica como fallback.
+try:
+    import re2 as _re2
+except ImportError:
+    _re2 = None
+
+# Opcional: PCRE2 com JIT (pypi `pcre`), opt-in via
+# ULF_REGEX_BACKEND=pcre2. O JIT só compensa quando o mesmo padrão
+# roda sobre muitos buffers — exatamente o caso do scan de filesystem.
+try:
+    import pcre as _pcre
+except ImportError:
+    _pcre = None
+
+# Opcional: autômato Aho-Corasick para o prefiltro de falsos positivos
+# (uma passada linear sobre o texto, independente do tamanho da lista)
+try:
+    import ahocorasick as _ahocorasick
+except ImportError:
+    _ahocorasick = None
+
+# Falsos positivos conhecidos, normalizados (casefold) e deduplicados
+# uma única vez no load do módulo
+_FALSE_POSITIVES = frozenset(entry.casefold() for entry in (
+    # Exemplos de documentação
+    'example.com', 'test@test.com', '000.000.000-00',
+    '0000-0000-0000-0000', '123-45-6789',
+    # Placeholders
+    'your_api_key', 'your_token', 'replace_me',
+    'xxx', 'yyy', 'zzz',
+    # Test data
+    'test_key', 'test_token', 'fake_',
+))
+
+# Matcher de falsos positivos, construído uma vez no primeiro uso
+_fp_matcher = None
+
+# Padrões compilados uma vez por processo: em watch mode cada ciclo de
+# auditoria cria um SecurityScanner novo, e recompilar ~20 regexes por
+# ciclo é desperdício puro
+_compiled_cache = None
+_combined_cache = None
+_severity_split_cache = None
+
+# Módulo gerado no build por gen_patterns.py, com todos os padrões já
+# compilados como constantes. O fingerprint protege contra um módulo
+# gerado de uma versão antiga dos padrões.
+_precompiled = None
+
+def _load_precompiled():
+    global _precompiled
+    if _precompiled is None:
+        try:
+            import patterns_compiled
+        except ImportError:
+            _precompiled = False
+        else:
+            if patterns_compiled.FINGERPRINT == SecurityPatterns.fingerprint():
+                _precompiled = patterns_compiled
+            else:
+                print("Warning: patterns_compiled.py is stale, recompiling at runtime")
+                _precompiled = False
+    return _precompiled or None
+
 @dataclass
 class ViolationMatch:
     pattern_name: str
@@ -16,6 +86,82 @@ class ViolationMatch:
     context: str
     severity: str  # 'critical' | 'high' | 'medium' | 'low'
 
+SEVERITY_LEVELS = ('critical', 'high', 'medium', 'low')
+_SEVERITY_CODES = {name: code for code, name in enumerate(SEVERITY_LEVELS)}
+
+class ViolationStore:
+    """Acumulador colunar (structure-of-arrays) de violações.
+
+    Em scans grandes, um ViolationMatch por hit significa milhões de
+    objetos Python. Aqui cada campo vive numa coluna própria (listas de
+    str + arrays compactos para linha/severidade) e a dataclass só é
+    materializada sob demanda, na hora de iterar para o relatório.
+    """
+
+    def __init__(self):
+        self._pattern_names: List[str] = []
+        self._file_paths: List[str] = []
+        self._line_numbers = array('L')
+        self._matched_texts: List[str] = []
+        self._contexts: List[str] = []
+        self._severities = array('B')
+        # Buckets de índices por severidade, mantidos na inserção para
+        # o agrupamento não precisar re-varrer a coleção inteira
+        self._severity_indices = tuple(array('L') for _ in SEVERITY_LEVELS)
+
+    def add(self, pattern_name: str, file_path: str, line_number: int,
+            matched_text: str, context: str, severity: str) -> None:
+        code = _SEVERITY_CODES[severity]
+        self._severity_indices[code].append(len(self._severities))
+        self._pattern_names.append(pattern_name)
+        self._file_paths.append(file_path)
+        self._line_numbers.append(line_number)
+        self._matched_texts.append(matched_text)
+        self._contexts.append(context)
+        self._severities.append(code)
+
+    def append(self, violation: ViolationMatch) -> None:
+        """Conveniência para listas vindas dos workers do pool"""
+        self.add(violation.pattern_name, violation.file_path,
+                 violation.line_number, violation.matched_text,
+                 violation.context, violation.severity)
+
+    def extend(self, violations) -> None:
+        for violation in violations:
+            self.append(violation)
+
+    def severity_codes(self) -> array:
+        """Coluna de severidades como códigos 0..3 (ordem de SEVERITY_LEVELS)"""
+        return self._severities
+
+    def severity_indices(self, code: int) -> array:
+        """Índices das violações com a severidade dada (código 0..3)"""
+        return self._severity_indices[code]
+
+    def severity_counts(self) -> Dict[str, int]:
+        """Contagem por severidade, O(1) a partir dos buckets incrementais"""
+        return {
+            name: len(self._severity_indices[code])
+            for code, name in enumerate(SEVERITY_LEVELS)
+        }
+
+    def __len__(self) -> int:
+        return len(self._severities)
+
+    def __getitem__(self, index: int) -> ViolationMatch:
+        return ViolationMatch(
+            pattern_name=self._pattern_names[index],
+            file_path=self._file_paths[index],
+            line_number=self._line_numbers[index],
+            matched_text=self._matched_texts[index],
+            context=self._contexts[index],
+            severity=SEVERITY_LEVELS[self._severities[index]],
+        )
+
+    def __iter__(self):
+        for index in range(len(self._severities)):
+            yield self[index]
+
 class SecurityPatterns:
     """Padrões de segurança para detecção"""
 
@@ -145,31 +291,167 @@ class SecurityPatterns:
         all_patterns.update(cls.LOG_PATTERNS)
         return all_patterns
 
+    @classmethod
+    def fingerprint(cls) -> str:
+        """Hash estável do conjunto de padrões, para validar o módulo gerado"""
+        canonical = repr(sorted(
+            (name, config['regex'], config['severity'])
+            for name, config in cls.get_all_patterns().items()
+        ))
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
     @classmethod
     def get_compiled_patterns(cls) -> Dict[str, Tuple[re.Pattern, Dict]]:
-        """Retorna padrões compilados para performance"""
-        all_patterns = cls.get_all_patterns()
-        compiled = {}
-        for name, config in all_patterns.items():
+        """Retorna padrões compilados para performance (cacheados)"""
+        global _compiled_cache
+        if _compiled_cache is None:
+            precompiled = _load_precompiled()
+            if precompiled is not None:
+                _compiled_cache = precompiled.REGISTRY
+                return _compiled_cache
+            all_patterns = cls.get_all_patterns()
+            compiled = {}
+            for name, config in all_patterns.items():
+                regex, flags = cls._split_inline_flags(config['regex'])
+                try:
+                    compiled[name] = (re.compile(regex, flags), config)
+                except re.error as e:
+                    print(f"Warning: Failed to compile pattern {name}: {e}")
+            _compiled_cache = compiled
+        return _compiled_cache
+
+    @classmethod
+    def get_combined_pattern(cls) -> Tuple[re.Pattern, Dict[str, Dict]]:
+        """Retorna um único regex fundido (alternation com grupos nomeados).
+
+        Compilado como bytes: os padrões são ASCII, então o scan roda
+        direto sobre o buffer mmap sem decodificar UTF-8 linha a linha.
+        Uma passada de finditer cobre todos os padrões; Match.lastgroup
+        identifica qual padrão disparou.
+        """
+        global _combined_cache
+        if _combined_cache is not None:
+            return _combined_cache
+
+        # COMBINED do módulo gerado é sempre um pattern do re stdlib;
+        # com um engine alternativo pedido (pcre2) ou instalado (re2),
+        # refunde via _fuse para honrar a ordem pcre2 > re2 > re —
+        # senão o build pré-compilado silenciaria o opt-in
+        wants_alt_engine = (
+            (_pcre is not None and os.environ.get('ULF_REGEX_BACKEND') == 'pcre2')
+            or _re2 is not None
+        )
+        precompiled = _load_precompiled()
+        if precompiled is not None and not wants_alt_engine:
+            configs = {name: config for name, (_, config) in precompiled.REGISTRY.items()}
+            _combined_cache = (precompiled.COMBINED, configs)
+            return _combined_cache
+
+        _combined_cache = cls._fuse(cls.get_all_patterns())
+        return _combined_cache
+
+    @classmethod
+    def get_severity_split_patterns(cls) -> Tuple[Tuple[re.Pattern, Dict], Tuple[re.Pattern, Dict]]:
+        """Retorna dois regexes fundidos: só padrões critical, e o resto.
+
+        O modo fail-fast roda a passada crítica primeiro e só gasta com
+        as outras famílias quando ela não dispara.
+        """
+        global _severity_split_cache
+        if _severity_split_cache is None:
+            critical, rest = {}, {}
+            for name, config in cls.get_all_patterns().items():
+                bucket = critical if config['severity'] == 'critical' else rest
+                bucket[name] = config
+            _severity_split_cache = (cls._fuse(critical), cls._fuse(rest))
+        return _severity_split_cache
+
+    @classmethod
+    def _fuse(cls, patterns: Dict[str, Dict]) -> Tuple[re.Pattern, Dict[str, Dict]]:
+        """Funde um dict de padrões numa alternation bytes compilada"""
+        branches = []
+        configs = {}
+        for name, config in patterns.items():
+            branches.append(f'(?P<{name}>{cls._as_branch(config["regex"])})')
+            configs[name] = config
+        fused = '|'.join(branches).encode('ascii')
+
+        if _pcre is not None and os.environ.get('ULF_REGEX_BACKEND') == 'pcre2':
+            try:
+                compiled = _pcre.compile(fused, jit=True)
+                # Warmup: paga o custo do JIT uma vez, no compile, em
+                # vez de no primeiro arquivo do scan
+                compiled.search(b'x' * 1024)
+                return compiled, configs
+            except Exception as e:
+                print(f"Warning: pcre2 backend failed, falling back: {e}")
+
+        if _re2 is not None:
             try:
-                compiled[name] = (re.compile(config['regex']), config)
-            except re.error as e:
-                print(f"Warning: Failed to compile pattern {name}: {e}")
-        return compiled
+                return _re2.compile(fused), configs
+            except _re2.error as e:
+                print(f"Warning: re2 rejected fused pattern, falling back to re: {e}")
+
+        return re.compile(fused), configs
+
+    @staticmethod
+    def _split_inline_flags(regex: str) -> Tuple[str, int]:
+        """Separa um (?i) inicial em re.IGNORECASE explícito.
+
+        Flag inline no meio do padrão impede engines alternativas
+        (re2, hyperscan) de tratar o padrão como case-insensitive no
+        nível do engine, e atrapalha a fusão em alternation.
+        """
+        if regex.startswith('(?i)'):
+            return regex[4:], re.IGNORECASE
+        return regex, 0
+
+    @classmethod
+    def _as_branch(cls, regex: str) -> str:
+        """Prepara um padrão para virar branch da alternation fundida.
+
+        Grupos de captura viram non-capturing para não conflitar com os
+        grupos nomeados externos, e case-insensitivity vira (?i:...)
+        escopado para não vazar para os outros branches.
+        """
+        regex, flags = cls._split_inline_flags(regex)
+        regex = re.sub(r'(?<!\\)\((?!\?)', '(?:', regex)
+        if flags & re.IGNORECASE:
+            regex = f'(?i:{regex})'
+        return regex
+
+    FALSE_POSITIVES = _FALSE_POSITIVES
 
     @classmethod
     def is_false_positive(cls, matched_text: str, pattern_name: str) -> bool:
-        """Detecta falsos positivos comuns"""
-        false_positives = [
-            # Exemplos de documentação
-            'example.com', 'test@test.com', '000.000.000-00',
-            '0000-0000-0000-0000', '123-45-6789',
-            # Placeholders
-            'YOUR_API_KEY', 'YOUR_TOKEN', 'REPLACE_ME',
-            'xxx', 'yyy', 'zzz',
-            # Test data
-            'test_key', 'test_token', 'fake_',
-        ]
-
-        matched_lower = matched_text.lower()
-        return any(fp in matched_lower for fp in false_positives)
+        """Detecta falsos positivos comuns.
+
+        Cacheado: o mesmo token tende a se repetir em muitos arquivos
+        (configs copiadas, fixtures), então o veredito é memoizado.
+        """
+        return _is_false_positive_cached(matched_text)
+
+    @classmethod
+    def _get_fp_matcher(cls):
+        """Matcher de passada única sobre a lista de falsos positivos.
+
+        Com pyahocorasick disponível usa um autômato Aho-Corasick; sem
+        ele, uma alternation de literais escapados compilada uma vez
+        (ainda uma varredura só, em vez de um `in` por entrada).
+        """
+        global _fp_matcher
+        if _fp_matcher is None:
+            if _ahocorasick is not None:
+                automaton = _ahocorasick.Automaton()
+                for word in cls.FALSE_POSITIVES:
+                    automaton.add_word(word, word)
+                automaton.make_automaton()
+                _fp_matcher = lambda text: next(automaton.iter(text), None) is not None
+            else:
+                fp_re = re.compile('|'.join(map(re.escape, sorted(cls.FALSE_POSITIVES))))
+                _fp_matcher = lambda text: fp_re.search(text) is not None
+        return _fp_matcher
+
+@lru_cache(maxsize=4096)
+def _is_false_positive_cached(matched_text: str) -> bool:
+    return SecurityPatterns._get_fp_matcher()(matched_text.casefold())
@@ -3,20 +3,83 @@ Security Scanner
 Varre filesystem, processos e environment variables
 """
 
+import mmap
 import os
 import psutil
 import re
+import signal
+import threading
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Set
-from patterns import SecurityPatterns, ViolationMatch
+from typing import List, Optional, Set
+from patterns import SEVERITY_LEVELS, SecurityPatterns, ViolationMatch, ViolationStore
+
+# Scanner reconstruído uma vez por processo worker (os re.Pattern
+# compilados não são pickláveis, então cada worker compila o próprio)
+_worker_scanner = None
+
+class CriticalFound(Exception):
+    """Sinaliza violação crítica em modo fail-fast, carregando o já coletado"""
+
+    def __init__(self, violations: List[ViolationMatch]):
+        super().__init__('critical violation found')
+        self.violations = violations
+
+def _scan_file_worker(file_path: str) -> List[ViolationMatch]:
+    """Entry point dos workers do pool para escanear um arquivo"""
+    global _worker_scanner
+    if _worker_scanner is None:
+        _worker_scanner = SecurityScanner()
+    return _worker_scanner.scan_file(Path(file_path))
 
 class SecurityScanner:
     """Scanner de segurança"""
 
-    def __init__(self, root_path: str = "/data"):
+    # Arquivos maiores que isso são pulados (bundles minificados,
+    # dumps binários etc. — custo de regex alto e sinal baixo)
+    MAX_FILE_SIZE = 5 * 1024 * 1024
+
+    # Orçamento de regex por arquivo: backtracking patológico em uma
+    # linha não pode travar a auditoria inteira (guard anti-ReDoS)
+    REGEX_TIMEOUT = 5.0
+
+    # Substrings-gatilho checadas antes do regex: toda família de
+    # padrões exige pelo menos uma delas, então um arquivo sem nenhum
+    # gatilho não pode gerar match. find() é ordens de grandeza mais
+    # barato que rodar a alternation inteira.
+    #
+    # Os gatilhos case-sensitive rodam direto sobre o buffer cru
+    # (mmap/bytes), sem nenhuma cópia; como quase todo texto tem
+    # dígito, a cópia lowercased para os gatilhos de keyword quase
+    # nunca é paga.
+    RAW_TRIGGERS = (
+        # Padrões numéricos (cartão, CPF, CNPJ, logs de ambos)
+        b'0', b'1', b'2', b'3', b'4', b'5', b'6', b'7', b'8', b'9',
+        # Chaves e tokens com prefixo fixo (regexes case-sensitive)
+        b'-----BEGIN', b'eyJ', b'AKIA', b'AIza', b'sk-',
+    )
+
+    # Padrões por keyword, case-insensitive
+    KEYWORD_TRIGGERS = (
+        b'passw', b'pwd', b'senha', b'api', b'token', b'pix',
+        b'merchant', b'transaction', b'txn', b'terminal', b'webhook',
+    )
+
+    def __init__(self, root_path: str = "/data", workers: Optional[int] = None,
+                 fail_fast: bool = False):
         self.root_path = Path(root_path)
-        self.patterns = SecurityPatterns.get_compiled_patterns()
-        self.violations: List[ViolationMatch] = []
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+        self.fail_fast = fail_fast
+        self.combined_pattern, self.pattern_configs = SecurityPatterns.get_combined_pattern()
+        self.violations = ViolationStore()
+
+        # Em fail-fast os críticos rodam numa passada separada, antes
+        # do resto, para abortar o quanto antes em árvores sujas
+        if fail_fast:
+            self._scan_passes = SecurityPatterns.get_severity_split_patterns()
+        else:
+            self._scan_passes = ((self.combined_pattern, self.pattern_configs),)
 
         # Diretórios para ignorar
         self.ignore_dirs = {
@@ -36,39 +99,152 @@ class SecurityScanner:
         violations = []
 
         try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                for line_num, line in enumerate(f, 1):
-                    # Verifica cada padrão
-                    for pattern_name, (regex, config) in self.patterns.items():
-                        matches = regex.finditer(line)
-                        for match in matches:
-                            matched_text = match.group(0)
-
-                            # Verifica falso positivo
-                            if SecurityPatterns.is_false_positive(matched_text, pattern_name):
-                                continue
-
-                            violations.append(ViolationMatch(
-                                pattern_name=pattern_name,
-                                file_path=str(file_path),
-                                line_number=line_num,
-                                matched_text=self._mask_sensitive(matched_text),
-                                context=line.strip()[:100],
-                                severity=config['severity']
-                            ))
+            with open(file_path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size > self.MAX_FILE_SIZE:
+                    return violations
+                try:
+                    buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                except ValueError:
+                    return violations  # arquivo vazio
+                with buf:
+                    violations = self._scan_with_timeout(buf, str(file_path))
         except Exception as e:
             print(f"Error scanning {file_path}: {e}")
 
         return violations
 
+    def _scan_with_timeout(self, buf, file_path: str) -> List[ViolationMatch]:
+        """Roda _scan_buffer com um deadline de wall-clock.
+
+        O timer SIGALRM só pode ser armado no main thread em Unix; fora
+        disso (Windows, threads) o scan roda sem guarda. Com backend
+        re2 o timeout nunca dispara, mas também não custa nada.
+        """
+        if (self.REGEX_TIMEOUT <= 0
+                or not hasattr(signal, 'setitimer')
+                or threading.current_thread() is not threading.main_thread()):
+            return self._scan_buffer(buf, file_path)
+
+        def _on_timeout(signum, frame):
+            raise TimeoutError(f"regex timeout ({self.REGEX_TIMEOUT}s) scanning {file_path}")
+
+        previous_handler = signal.signal(signal.SIGALRM, _on_timeout)
+        signal.setitimer(signal.ITIMER_REAL, self.REGEX_TIMEOUT)
+        try:
+            return self._scan_buffer(buf, file_path)
+        except TimeoutError as e:
+            print(f"Warning: {e}, skipping file")
+            return []
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous_handler)
+
+    def _scan_buffer(self, buf, file_path: str) -> List[ViolationMatch]:
+        """Roda o regex fundido sobre um buffer de bytes inteiro.
+
+        Linhas e contexto só são materializados quando há match, então
+        arquivos limpos não pagam decode nem split por linha.
+        """
+        violations = []
+        newline_offsets = None
+        context_line_num = 0
+        context = ''
+
+        # Binário? NUL nos primeiros 4KB é sinal suficiente
+        if b'\x00' in buf[:4096]:
+            return violations
+
+        # Prefiltro barato: sem nenhum gatilho, nenhum padrão casa
+        if not self._has_scan_trigger(buf):
+            return violations
+
+        # Uma passada por regex fundido cobre todos os padrões do
+        # passe; em fail-fast o primeiro passe é só dos críticos
+        for pattern, configs in self._scan_passes:
+            for match in pattern.finditer(buf):
+                pattern_name = match.lastgroup
+                config = configs[pattern_name]
+                matched_text = match.group(0).decode('utf-8', errors='ignore')
+
+                # Verifica falso positivo
+                if SecurityPatterns.is_false_positive(matched_text, pattern_name):
+                    continue
+
+                if newline_offsets is None:
+                    newline_offsets = self._newline_offsets(buf)
+
+                line_num = bisect_right(newline_offsets, match.start()) + 1
+
+                # Vários matches na mesma linha (comum com a alternation
+                # fundida) reaproveitam o contexto já materializado
+                if line_num != context_line_num:
+                    line_start = newline_offsets[line_num - 2] + 1 if line_num > 1 else 0
+                    line_end = newline_offsets[line_num - 1] if line_num <= len(newline_offsets) else len(buf)
+                    context = buf[line_start:line_end].decode('utf-8', errors='ignore').strip()[:100]
+                    context_line_num = line_num
+
+                violations.append(ViolationMatch(
+                    pattern_name=pattern_name,
+                    file_path=file_path,
+                    line_number=line_num,
+                    matched_text=self._mask_sensitive(matched_text),
+                    context=context,
+                    severity=config['severity']
+                ))
+
+            # Críticos dispararam: não gasta com as outras famílias
+            if self.fail_fast and violations:
+                break
+
+        return violations
+
+    @classmethod
+    def _has_scan_trigger(cls, buf) -> bool:
+        """True se o conteúdo cru tem algum gatilho de padrão"""
+        # find() opera direto sobre mmap/bytes, sem materializar cópia
+        if any(buf.find(trigger) != -1 for trigger in cls.RAW_TRIGGERS):
+            return True
+        # Só paga a cópia lowercased quando nenhum gatilho cru bateu
+        lowered = bytes(buf).lower()
+        return any(trigger in lowered for trigger in cls.KEYWORD_TRIGGERS)
+
+    @staticmethod
+    def _newline_offsets(buf) -> List[int]:
+        """Offsets de todos os \\n do buffer, para mapear match -> linha"""
+        offsets = []
+        pos = buf.find(b'\n')
+        while pos != -1:
+            offsets.append(pos)
+            pos = buf.find(b'\n', pos + 1)
+        return offsets
+
     def scan_filesystem(self) -> List[ViolationMatch]:
         """Escaneia todo o filesystem"""
         print(f"[Scanner] Scanning filesystem: {self.root_path}")
         violations = []
 
-        for file_path in self._walk_directory(self.root_path):
-            file_violations = self.scan_file(file_path)
-            violations.extend(file_violations)
+        paths = list(self._walk_directory(self.root_path))
+
+        # Em fail-fast o scan é sequencial: a primeira crítica aborta a
+        # travessia imediatamente, sem esperar um pool inteiro drenar
+        if self.fail_fast:
+            for path in paths:
+                file_violations = self.scan_file(Path(path))
+                violations.extend(file_violations)
+                if any(v.severity == 'critical' for v in file_violations):
+                    print("[Scanner] Critical violation found, aborting scan (fail-fast)")
+                    raise CriticalFound(violations)
+            return violations
+
+        # Scan de arquivo é CPU-bound (regex segura o GIL), então
+        # paraleliza por arquivo num pool de processos
+        if self.workers > 1 and len(paths) > 1:
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                for file_violations in executor.map(_scan_file_worker, paths, chunksize=16):
+                    violations.extend(file_violations)
+        else:
+            for path in paths:
+                violations.extend(self.scan_file(Path(path)))
 
         return violations
 
@@ -82,23 +258,88 @@ class SecurityScanner:
             if key in {'PATH', 'HOME', 'USER', 'SHELL', 'PWD', 'LANG'}:
                 continue
 
-            # Verifica patterns nos valores
-            for pattern_name, (regex, config) in self.patterns.items():
-                if regex.search(value):
-                    violations.append(ViolationMatch(
-                        pattern_name=pattern_name,
-                        file_path='environment',
-                        line_number=0,
-                        matched_text=f"{key}={self._mask_sensitive(value)}",
-                        context=f"Environment variable: {key}",
-                        severity=config['severity']
-                    ))
+            # Prefiltro barato antes de qualquer regex: a maioria dos
+            # valores (paths curtos, números, flags) não tem gatilho
+            raw = value.encode('utf-8', errors='ignore')
+            if not self._has_scan_trigger(raw):
+                continue
+
+            # Uma passada do regex fundido; reporta cada padrão uma vez
+            seen = set()
+            for match in self.combined_pattern.finditer(raw):
+                pattern_name = match.lastgroup
+                if pattern_name in seen:
+                    continue
+                seen.add(pattern_name)
+                violations.append(ViolationMatch(
+                    pattern_name=pattern_name,
+                    file_path='environment',
+                    line_number=0,
+                    matched_text=f"{key}={self._mask_sensitive(value)}",
+                    context=f"Environment variable: {key}",
+                    severity=self.pattern_configs[pattern_name]['severity']
+                ))
 
         return violations
 
     def scan_processes(self) -> List[ViolationMatch]:
         """Escaneia processos rodando"""
         print("[Scanner] Scanning running processes")
+
+        # Em Linux lê /proc direto: 1-2 syscalls por processo em vez
+        # dos ~6 que o psutil gasta montando um Process por pid
+        if os.path.isdir('/proc'):
+            return self._scan_proc_cmdlines()
+        return self._scan_processes_psutil()
+
+    def _scan_proc_cmdlines(self) -> List[ViolationMatch]:
+        """Escaneia cmdlines lendo /proc/<pid>/cmdline diretamente"""
+        violations = []
+
+        for pid in os.listdir('/proc'):
+            if not pid.isdigit():
+                continue
+            try:
+                with open(f'/proc/{pid}/cmdline', 'rb') as f:
+                    cmdline = f.read()
+            except OSError:
+                continue  # processo morreu ou sem permissão
+            if not cmdline:
+                continue
+
+            cmdline = cmdline.replace(b'\x00', b' ')
+            if not self._has_scan_trigger(cmdline):
+                continue
+
+            proc_name = None
+            for match in self.combined_pattern.finditer(cmdline):
+                pattern_name = match.lastgroup
+                matched_text = match.group(0).decode('utf-8', errors='ignore')
+
+                if SecurityPatterns.is_false_positive(matched_text, pattern_name):
+                    continue
+
+                # Só abre /proc/<pid>/comm quando há violação a reportar
+                if proc_name is None:
+                    try:
+                        with open(f'/proc/{pid}/comm') as f:
+                            proc_name = f.read().strip()
+                    except OSError:
+                        proc_name = 'unknown'
+
+                violations.append(ViolationMatch(
+                    pattern_name=pattern_name,
+                    file_path='process',
+                    line_number=int(pid),
+                    matched_text=self._mask_sensitive(matched_text),
+                    context=f"Process: {proc_name}",
+                    severity=self.pattern_configs[pattern_name]['severity']
+                ))
+
+        return violations
+
+    def _scan_processes_psutil(self) -> List[ViolationMatch]:
+        """Fallback via psutil para plataformas sem /proc"""
         violations = []
 
         try:
@@ -108,25 +349,24 @@ class SecurityScanner:
                     if not cmdline:
                         continue
 
-                    cmd_str = ' '.join(cmdline)
+                    cmd_str = ' '.join(cmdline).encode('utf-8', errors='ignore')
 
                     # Verifica patterns nos comandos
-                    for pattern_name, (regex, config) in self.patterns.items():
-                        matches = regex.finditer(cmd_str)
-                        for match in matches:
-                            matched_text = match.group(0)
-
-                            if SecurityPatterns.is_false_positive(matched_text, pattern_name):
-                                continue
-
-                            violations.append(ViolationMatch(
-                                pattern_name=pattern_name,
-                                file_path='process',
-                                line_number=proc.info['pid'],
-                                matched_text=self._mask_sensitive(matched_text),
-                                context=f"Process: {proc.info['name']}",
-                                severity=config['severity']
-                            ))
+                    for match in self.combined_pattern.finditer(cmd_str):
+                        pattern_name = match.lastgroup
+                        matched_text = match.group(0).decode('utf-8', errors='ignore')
+
+                        if SecurityPatterns.is_false_positive(matched_text, pattern_name):
+                            continue
+
+                        violations.append(ViolationMatch(
+                            pattern_name=pattern_name,
+                            file_path='process',
+                            line_number=proc.info['pid'],
+                            matched_text=self._mask_sensitive(matched_text),
+                            context=f"Process: {proc.info['name']}",
+                            severity=self.pattern_configs[pattern_name]['severity']
+                        ))
                 except (psutil.NoSuchProcess, psutil.AccessDenied):
                     continue
         except Exception as e:
@@ -134,36 +374,45 @@ class SecurityScanner:
 
         return violations
 
-    def run_full_audit(self) -> List[ViolationMatch]:
+    def run_full_audit(self) -> ViolationStore:
         """Executa auditoria completa"""
         print("[Auditor] Starting full security audit...")
-        all_violations = []
 
-        # Filesystem
-        all_violations.extend(self.scan_filesystem())
+        try:
+            # Filesystem
+            self.violations.extend(self.scan_filesystem())
+
+            # Environment
+            self.violations.extend(self.scan_environment())
 
-        # Environment
-        all_violations.extend(self.scan_environment())
+            # Processes
+            self.violations.extend(self.scan_processes())
+        except CriticalFound as found:
+            self.violations.extend(found.violations)
 
-        # Processes
-        all_violations.extend(self.scan_processes())
+        print(f"[Auditor] Audit complete. Found {len(self.violations)} violations.")
+        return self.violations
 
-        print(f"[Auditor] Audit complete. Found {len(all_violations)} violations.")
-        return all_violations
+    def _walk_directory(self, path):
+        """Generator para percorrer diretórios.
 
-    def _walk_directory(self, path: Path):
-        """Generator para percorrer diretórios"""
+        Usa os.scandir: o DirEntry já traz d_type do getdents, então
+        is_dir/is_file não custam um stat() extra por entrada. Yields
+        paths como str para evitar alocar um Path por arquivo.
+        """
         try:
-            for item in path.iterdir():
-                # Ignora diretórios na blacklist
-                if item.is_dir():
-                    if item.name in self.ignore_dirs:
-                        continue
-                    yield from self._walk_directory(item)
-                elif item.is_file():
-                    # Verifica extensão
-                    if item.suffix in self.scan_extensions:
-                        yield item
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    # Ignora diretórios na blacklist
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name in self.ignore_dirs:
+                            continue
+                        yield from self._walk_directory(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        # Verifica extensão
+                        dot = entry.name.rfind('.')
+                        if dot >= 0 and entry.name[dot:] in self.scan_extensions:
+                            yield entry.path
         except PermissionError:
             pass
 
@@ -174,15 +423,12 @@ class SecurityScanner:
         return text[:4] + "***" + text[-4:]
 
     def get_violations_by_severity(self) -> dict:
-        """Agrupa violações por severidade"""
-        result = {
-            'critical': [],
-            'high': [],
-            'medium': [],
-            'low': []
+        """Agrupa violações por severidade.
+
+        Os buckets são mantidos incrementalmente pelo ViolationStore
+        durante a coleta, então aqui é só materializar os índices.
+        """
+        return {
+            name: [self.violations[i] for i in self.violations.severity_indices(code)]
+            for code, name in enumerate(SEVERITY_LEVELS)
         }
-
-        for violation in self.violations:
-            result[violation.severity].append(violation)
-
-        return result
@@ -1,11 +1,30 @@
 """
 Anthropic API Cost Collector
 """
+import asyncio
 import os
 import requests
 from datetime import datetime, timedelta
 from typing import Dict, List
 
+# Flat tuple-keyed pricing table, built once at import instead of a
+# nested dict rebuilt on every cost calculation.
+#
+# Anthropic Pricing (2026):
+# - Claude Opus 4.5: $15/Mtok input, $75/Mtok output
+# - Claude Sonnet 4.5: $3/Mtok input, $15/Mtok output
+# - Claude Haiku: $0.25/Mtok input, $1.25/Mtok output
+PRICING = {
+    ('claude-opus-4-5', 'input'): 15.0,
+    ('claude-opus-4-5', 'output'): 75.0,
+    ('claude-sonnet-4-5', 'input'): 3.0,
+    ('claude-sonnet-4-5', 'output'): 15.0,
+    ('claude-sonnet-4', 'input'): 3.0,
+    ('claude-sonnet-4', 'output'): 15.0,
+    ('claude-haiku', 'input'): 0.25,
+    ('claude-haiku', 'output'): 1.25,
+}
+
 class AnthropicCollector:
     def __init__(self):
         self.api_key = os.getenv('ANTHROPIC_API_KEY')
@@ -18,13 +37,15 @@ class AnthropicCollector:
         Note: Anthropic doesn't have a public billing API yet as of 2026.
         We'll estimate based on our own request logs or use console data.
         """
+        now = datetime.now()
         if not start_date:
-            start_date = datetime.now() - timedelta(days=30)
+            start_date = now - timedelta(days=30)
         if not end_date:
-            end_date = datetime.now()
+            end_date = now
 
         # For now, we'll track usage through our own logging
         # In the future, Anthropic may provide a billing API
+        usage = self._get_local_usage_estimate(start_date, end_date)
 
         return {
             'service': 'anthropic',
@@ -32,8 +53,8 @@ class AnthropicCollector:
                 'start': start_date.isoformat(),
                 'end': end_date.isoformat()
             },
-            'usage': self._get_local_usage_estimate(start_date, end_date),
-            'cost': self._calculate_cost()
+            'usage': usage,
+            'cost': self._calculate_cost(usage.get('by_model'))
         }
 
     def _get_local_usage_estimate(self, start_date: datetime, end_date: datetime) -> Dict:
@@ -49,26 +70,24 @@ class AnthropicCollector:
             'by_model': {}
         }
 
-    def _calculate_cost(self) -> Dict:
+    def _calculate_cost(self, by_model: Dict = None) -> Dict:
         """
-        Calculate costs based on pricing
+        Calculate costs from per-model usage against PRICING
 
-        Anthropic Pricing (2026):
-        - Claude Opus 4.5: $15/Mtok input, $75/Mtok output
-        - Claude Sonnet 4.5: $3/Mtok input, $15/Mtok output
-        - Claude Haiku: $0.25/Mtok input, $1.25/Mtok output
+        by_model maps model -> {kind: units}, with units already in
+        Mtok.
         """
-        pricing = {
-            'claude-opus-4-5': {'input': 15.0, 'output': 75.0},
-            'claude-sonnet-4-5': {'input': 3.0, 'output': 15.0},
-            'claude-sonnet-4': {'input': 3.0, 'output': 15.0},
-            'claude-haiku': {'input': 0.25, 'output': 1.25}
+        by_model = by_model or {}
+        costs = {
+            model: sum(
+                units * PRICING.get((model, kind), 0.0)
+                for kind, units in usage.items()
+            )
+            for model, usage in by_model.items()
         }
-
-        # TODO: Calculate actual costs from usage
         return {
-            'total': 0.0,
-            'by_model': {},
+            'total': sum(costs.values()),
+            'by_model': costs,
             'currency': 'USD'
         }
 
@@ -78,10 +97,15 @@ class AnthropicCollector:
         data = self.get_usage(start_date=start_of_month)
         return data['cost']['total']
 
+    async def get_current_month_cost_async(self) -> float:
+        """Async wrapper; runs the (future) blocking lookup off the event loop"""
+        return await asyncio.to_thread(self.get_current_month_cost)
+
     def project_end_of_month(self) -> Dict:
         """Project cost to end of month based on current usage"""
-        start_of_month = datetime.now().replace(day=1, hour=0, minute=0, second=0)
-        current_day = datetime.now().day
+        now = datetime.now()
+        start_of_month = now.replace(day=1, hour=0, minute=0, second=0)
+        current_day = now.day
         days_in_month = 30  # Approximation
 
         current_cost = self.get_current_month_cost()
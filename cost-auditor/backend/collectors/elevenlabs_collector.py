@@ -3,51 +3,77 @@ ElevenLabs API Cost Collector
 """
 import os
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from datetime import datetime, timedelta
 from typing import Dict
 
+from collectors.http import get_with_retry
+
 class ElevenLabsCollector:
     def __init__(self):
         self.api_key = os.getenv('ELEVENLABS_API_KEY')
         self.base_url = 'https://api.elevenlabs.io/v1'
 
+        # Shared session: keep-alive avoids a fresh TCP+TLS handshake
+        # on every collection cycle, with retries for flaky upstreams
+        self.session = requests.Session()
+        if self.api_key:
+            self.session.headers['xi-api-key'] = self.api_key
+        self.session.mount('https://', HTTPAdapter(
+            max_retries=Retry(total=3, backoff_factor=0.3)
+        ))
+
     def get_usage(self) -> Dict:
         """Get usage from ElevenLabs API"""
         if not self.api_key:
             return {'error': 'ELEVENLABS_API_KEY not configured'}
 
-        headers = {
-            'xi-api-key': self.api_key
-        }
-
         try:
             # Get subscription info (includes usage)
-            resp = requests.get(
+            resp = self.session.get(
                 f'{self.base_url}/user/subscription',
-                headers=headers,
                 timeout=10
             )
-            data = resp.json()
-
-            character_count = data.get('character_count', 0)
-            character_limit = data.get('character_limit', 0)
-            tier = data.get('tier', 'free')
-
-            return {
-                'service': 'elevenlabs',
-                'subscription': {
-                    'tier': tier,
-                    'character_count': character_count,
-                    'character_limit': character_limit,
-                    'character_remaining': character_limit - character_count,
-                    'usage_percent': (character_count / character_limit * 100) if character_limit > 0 else 0
-                },
-                'cost': self._calculate_cost(tier, character_count)
-            }
+            return self._build_usage(resp.json())
+
+        except Exception as e:
+            return {'error': str(e)}
+
+    async def get_usage_async(self) -> Dict:
+        """Async get_usage over the shared httpx client"""
+        if not self.api_key:
+            return {'error': 'ELEVENLABS_API_KEY not configured'}
+
+        try:
+            resp = await get_with_retry(
+                f'{self.base_url}/user/subscription',
+                service='elevenlabs',
+                headers={'xi-api-key': self.api_key}
+            )
+            return self._build_usage(resp.json())
 
         except Exception as e:
             return {'error': str(e)}
 
+    def _build_usage(self, data: Dict) -> Dict:
+        """Build the usage payload from a subscription response"""
+        character_count = data.get('character_count', 0)
+        character_limit = data.get('character_limit', 0)
+        tier = data.get('tier', 'free')
+
+        return {
+            'service': 'elevenlabs',
+            'subscription': {
+                'tier': tier,
+                'character_count': character_count,
+                'character_limit': character_limit,
+                'character_remaining': character_limit - character_count,
+                'usage_percent': (character_count / character_limit * 100) if character_limit > 0 else 0
+            },
+            'cost': self._calculate_cost(tier, character_count)
+        }
+
     def _calculate_cost(self, tier: str, character_count: int) -> Dict:
         """
         Calculate ElevenLabs costs
@@ -83,3 +109,13 @@ class ElevenLabsCollector:
         """Get current month cost"""
         data = self.get_usage()
         return data.get('cost', {}).get('total', 0.0)
+
+    async def get_current_month_cost_async(self) -> float:
+        """Get current month cost without blocking the event loop"""
+        data = await self.get_usage_async()
+        if 'error' in data:
+            # Raise instead of returning 0.0: swallowing the failure
+            # here would feed a bogus $0 into the cost cache and keep
+            # the circuit breaker from ever seeing the outage
+            raise RuntimeError(data['error'])
+        return data.get('cost', {}).get('total', 0.0)
@@ -1,6 +1,7 @@
 """
 Google Cloud Platform Cost Collector
 """
+import asyncio
 import os
 from google.cloud import billing_v1
 from google.cloud import monitoring_v3
@@ -14,10 +15,11 @@ class GCPCollector:
 
     def get_usage(self, start_date: datetime = None, end_date: datetime = None) -> Dict:
         """Get GCP usage and costs"""
+        now = datetime.now()
         if not start_date:
-            start_date = datetime.now() - timedelta(days=30)
+            start_date = now - timedelta(days=30)
         if not end_date:
-            end_date = datetime.now()
+            end_date = now
 
         try:
             costs = self._get_billing_data(start_date, end_date)
@@ -121,6 +123,17 @@ class GCPCollector:
         data = self.get_usage(start_date=start_of_month)
         return data.get('costs', {}).get('total', 0.0)
 
+    async def get_current_month_cost_async(self) -> float:
+        """Async wrapper; the google-cloud clients are blocking"""
+        start_of_month = datetime.now().replace(day=1, hour=0, minute=0, second=0)
+        data = await asyncio.to_thread(self.get_usage, start_of_month)
+        if 'error' in data:
+            # Raise instead of returning 0.0: swallowing the failure
+            # here would feed a bogus $0 into the cost cache and keep
+            # the circuit breaker from ever seeing the outage
+            raise RuntimeError(data['error'])
+        return data.get('costs', {}).get('total', 0.0)
+
     def get_cost_breakdown(self) -> Dict:
         """Get detailed cost breakdown by service"""
         data = self.get_usage()
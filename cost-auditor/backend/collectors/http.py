@@ -0,0 +1,90 @@
+"""
+Shared async HTTP client for collectors
+"""
+import asyncio
+import random
+import time
+
+import httpx
+
+_client = None
+
+# Per-service semaphores: cap in-flight requests per provider so a
+# burst of endpoints hitting one API doesn't trigger its rate limit
+_semaphores = {}
+
+# Retryable statuses: rate limiting and transient server errors
+_RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+def get_async_client() -> httpx.AsyncClient:
+    """Lazily create the shared AsyncClient (one connection pool per process)"""
+    global _client
+    if _client is None:
+        # Tight connect/read budgets: a dead provider fails the
+        # connect in 2s instead of eating the whole 10s default
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(10.0, connect=2.0, read=5.0)
+        )
+    return _client
+
+class CircuitBreaker:
+    """
+    Short-circuit calls to a failing provider
+
+    After fail_max consecutive failures the breaker opens and callers
+    should skip the provider for reset_timeout seconds; the first call
+    after the cooldown goes through as a trial and either closes the
+    breaker (success) or reopens it (failure).
+    """
+
+    def __init__(self, fail_max: int = 3, reset_timeout: float = 60.0):
+        self.fail_max = fail_max
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = 0.0
+
+    @property
+    def open(self) -> bool:
+        return (
+            self._failures >= self.fail_max
+            and time.monotonic() - self._opened_at < self.reset_timeout
+        )
+
+    def record_success(self):
+        self._failures = 0
+
+    def record_failure(self):
+        self._failures += 1
+        if self._failures >= self.fail_max:
+            self._opened_at = time.monotonic()
+
+def get_semaphore(service: str) -> asyncio.Semaphore:
+    """Lazily create the per-service concurrency cap"""
+    if service not in _semaphores:
+        _semaphores[service] = asyncio.Semaphore(4)
+    return _semaphores[service]
+
+async def get_with_retry(url: str, service: str, headers: dict = None, attempts: int = 4) -> httpx.Response:
+    """
+    GET through the shared client, bounded by the service semaphore,
+    retrying 429/5xx with exponential backoff plus jitter
+    """
+    client = get_async_client()
+    async with get_semaphore(service):
+        delay = 0.5
+        for attempt in range(attempts):
+            resp = await client.get(url, headers=headers)
+            if resp.status_code not in _RETRY_STATUSES:
+                return resp
+            if attempt == attempts - 1:
+                resp.raise_for_status()
+            await asyncio.sleep(delay + random.uniform(0, delay))
+            delay *= 2
+    return resp
+
+async def aclose_async_client():
+    """Close the shared client (called on app shutdown)"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
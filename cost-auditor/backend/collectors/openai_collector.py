@@ -1,17 +1,53 @@
 """
 OpenAI API Cost Collector
 """
+import asyncio
 import os
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from datetime import datetime, timedelta
 from typing import Dict
 
+# Flat tuple-keyed pricing table, built once at import: one dict
+# lookup per (model, kind) instead of a nested dict rebuilt per call.
+#
+# Pricing (2026 estimates):
+# - GPT-4 Turbo: $10/Mtok input, $30/Mtok output
+# - GPT-4: $30/Mtok input, $60/Mtok output
+# - GPT-3.5 Turbo: $0.5/Mtok input, $1.5/Mtok output
+# - DALL-E 3: $0.040-$0.120 per image (size dependent; avg used)
+# - DALL-E 2: $0.016-$0.020 per image (avg used)
+# - Whisper: $0.006 per minute
+PRICING = {
+    ('gpt-4-turbo', 'input'): 10.0,
+    ('gpt-4-turbo', 'output'): 30.0,
+    ('gpt-4', 'input'): 30.0,
+    ('gpt-4', 'output'): 60.0,
+    ('gpt-3.5-turbo', 'input'): 0.5,
+    ('gpt-3.5-turbo', 'output'): 1.5,
+    ('dall-e-3', 'per_image'): 0.08,
+    ('dall-e-2', 'per_image'): 0.018,
+    ('whisper-1', 'per_minute'): 0.006,
+}
+
 class OpenAICollector:
     def __init__(self):
         self.api_key = os.getenv('OPENAI_API_KEY')
         self.base_url = 'https://api.openai.com/v1'
         self.org_id = os.getenv('OPENAI_ORG_ID')  # Optional
 
+        # Pooled session with auth set once: keep-alive plus retries
+        self.session = requests.Session()
+        if self.api_key:
+            self.session.headers['Authorization'] = f'Bearer {self.api_key}'
+        if self.org_id:
+            self.session.headers['OpenAI-Organization'] = self.org_id
+        self.session.mount('https://', HTTPAdapter(
+            pool_connections=10, pool_maxsize=20,
+            max_retries=Retry(total=3, backoff_factor=0.3)
+        ))
+
     def get_usage(self, start_date: datetime = None, end_date: datetime = None) -> Dict:
         """
         Get usage from OpenAI API
@@ -22,71 +58,61 @@ class OpenAICollector:
         if not self.api_key:
             return {'error': 'OPENAI_API_KEY not configured'}
 
+        now = datetime.now()
         if not start_date:
-            start_date = datetime.now() - timedelta(days=30)
+            start_date = now - timedelta(days=30)
         if not end_date:
-            end_date = datetime.now()
-
-        headers = {
-            'Authorization': f'Bearer {self.api_key}'
-        }
-        if self.org_id:
-            headers['OpenAI-Organization'] = self.org_id
+            end_date = now
 
         try:
-            # Format dates for API
-            start_str = start_date.strftime('%Y-%m-%d')
-            end_str = end_date.strftime('%Y-%m-%d')
+            # Format dates for API; isoformat avoids the C locale
+            # machinery strftime goes through
+            start_str = start_date.date().isoformat()
+            end_str = end_date.date().isoformat()
 
             # Note: This endpoint may change. Check OpenAI docs for current billing API
             # Placeholder implementation
+            usage = self._get_usage_details(start_str, end_str)
             return {
                 'service': 'openai',
                 'period': {
                     'start': start_str,
                     'end': end_str
                 },
-                'usage': self._get_usage_details(headers, start_str, end_str),
-                'cost': self._calculate_cost()
+                'usage': usage,
+                'cost': self._calculate_cost(usage.get('by_model'))
             }
 
         except Exception as e:
             return {'error': str(e)}
 
-    def _get_usage_details(self, headers: Dict, start_date: str, end_date: str) -> Dict:
+    def _get_usage_details(self, start_date: str, end_date: str) -> Dict:
         """Get usage details"""
-        # This would query actual usage from OpenAI
+        # This would query actual usage from OpenAI via self.session
         # Implementation depends on current API
         return {
             'total_requests': 0,
             'by_model': {}
         }
 
-    def _calculate_cost(self) -> Dict:
+    def _calculate_cost(self, by_model: Dict = None) -> Dict:
         """
-        Calculate OpenAI costs
+        Calculate OpenAI costs from per-model usage against PRICING
 
-        Pricing (2026 estimates):
-        - GPT-4 Turbo: $10/Mtok input, $30/Mtok output
-        - GPT-4: $30/Mtok input, $60/Mtok output
-        - GPT-3.5 Turbo: $0.5/Mtok input, $1.5/Mtok output
-        - DALL-E 3: $0.040-$0.120 per image (size dependent)
-        - DALL-E 2: $0.016-$0.020 per image
-        - Whisper: $0.006 per minute
+        by_model maps model -> {kind: units}, with units already in the
+        pricing unit (Mtok / images / minutes).
         """
-        pricing = {
-            'gpt-4-turbo': {'input': 10.0, 'output': 30.0},
-            'gpt-4': {'input': 30.0, 'output': 60.0},
-            'gpt-3.5-turbo': {'input': 0.5, 'output': 1.5},
-            'dall-e-3': {'per_image': 0.08},  # Average
-            'dall-e-2': {'per_image': 0.018},  # Average
-            'whisper-1': {'per_minute': 0.006}
+        by_model = by_model or {}
+        costs = {
+            model: sum(
+                units * PRICING.get((model, kind), 0.0)
+                for kind, units in usage.items()
+            )
+            for model, usage in by_model.items()
         }
-
-        # TODO: Calculate actual costs from usage
         return {
-            'total': 0.0,
-            'by_model': {},
+            'total': sum(costs.values()),
+            'by_model': costs,
             'currency': 'USD'
         }
 
@@ -95,3 +121,7 @@ class OpenAICollector:
         start_of_month = datetime.now().replace(day=1, hour=0, minute=0, second=0)
         data = self.get_usage(start_date=start_of_month)
         return data.get('cost', {}).get('total', 0.0)
+
+    async def get_current_month_cost_async(self) -> float:
+        """Async wrapper; runs the blocking usage lookup off the event loop"""
+        return await asyncio.to_thread(self.get_current_month_cost)
@@ -1,20 +1,45 @@
 """
 Cost Auditor - Main FastAPI Application
 """
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Depends, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
 from typing import Dict, List
 import asyncio
 
-from models import session, CostRecord, BudgetLimit, Alert, UsageMetric, Optimization
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from cachetools import TTLCache
+from prometheus_client import Counter, Histogram
+from prometheus_fastapi_instrumentator import Instrumentator
+
+from models import SessionLocal, get_db, CostRecord, CostSnapshot, BudgetLimit, Alert, UsageMetric, Optimization
 from collectors.anthropic_collector import AnthropicCollector
 from collectors.replicate_collector import ReplicateCollector
 from collectors.elevenlabs_collector import ElevenLabsCollector
 from collectors.openai_collector import OpenAICollector
 from collectors.gcp_collector import GCPCollector
-
-app = FastAPI(title="Cost Auditor", version="1.0.0")
+from collectors.http import aclose_async_client, CircuitBreaker
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Per-worker startup/shutdown: scheduler up, HTTP pool down"""
+    # TODO: also schedule hourly cost collection and weekly
+    # optimization analysis here
+    scheduler.add_job(run_alert_check, 'interval', minutes=15)
+    scheduler.add_job(refresh_cost_snapshots, 'interval', minutes=15)
+    scheduler.start()
+    yield
+    scheduler.shutdown(wait=False)
+    await aclose_async_client()
+
+# orjson serializes datetimes natively and is ~2x faster than the
+# stdlib encoder on list-of-dict payloads like /history
+app = FastAPI(title="Cost Auditor", version="1.0.0", lifespan=lifespan, default_response_class=ORJSONResponse)
 
 # CORS
 app.add_middleware(
@@ -25,6 +50,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Prometheus: per-endpoint latency via the instrumentator, plus
+# collector-level timings so slow providers are visible in isolation
+Instrumentator().instrument(app).expose(app)
+
+COLLECTOR_SECONDS = Histogram(
+    'collector_seconds', 'Time spent in collector calls',
+    ['service', 'method']
+)
+COLLECTOR_ERRORS = Counter(
+    'collector_errors_total', 'Collector calls that raised',
+    ['service', 'method']
+)
+
 # Collectors
 collectors = {
     'anthropic': AnthropicCollector(),
@@ -34,6 +72,56 @@ collectors = {
     'gcp': GCPCollector()
 }
 
+# Service-name set computed once; collectors never changes after import
+SERVICES = frozenset(collectors)
+
+# One breaker per provider: after 3 consecutive failures the provider
+# is skipped for 60s instead of every caller paying a full timeout
+_breakers = {service: CircuitBreaker() for service in collectors}
+
+# Pre-create the label children so the hot path never pays the
+# label-resolution dict lookups
+for _service in collectors:
+    for _method in ('month_cost', 'usage'):
+        COLLECTOR_SECONDS.labels(_service, _method)
+        COLLECTOR_ERRORS.labels(_service, _method)
+
+# Cached per-service monthly cost. Provider billing data aggregates
+# hourly at best, so a short TTL kills most duplicate upstream calls
+# across /costs/current, /budgets/status, alerts and projections.
+_cost_cache = TTLCache(maxsize=32, ttl=900)
+
+# Budgets change rarely (only via POST /budgets, which busts this);
+# the alert loop reads them every run, so snapshot them for 60s
+_budget_cache = TTLCache(maxsize=1, ttl=60)
+
+scheduler = AsyncIOScheduler()
+
+def get_budgets_cached(db: Session):
+    """Budget rows for background loops, cached for up to 60s"""
+    if 'budgets' not in _budget_cache:
+        _budget_cache['budgets'] = db.query(BudgetLimit).all()
+    return _budget_cache['budgets']
+
+async def get_month_cost_cached(service_name: str) -> float:
+    """Current-month cost for a service, cached with a 15 min TTL"""
+    key = (service_name, datetime.now().strftime('%Y-%m'))
+    if key in _cost_cache:
+        return _cost_cache[key]
+    breaker = _breakers[service_name]
+    if breaker.open:
+        raise RuntimeError(f'{service_name} unavailable (circuit open, retrying after cooldown)')
+    with COLLECTOR_SECONDS.labels(service_name, 'month_cost').time():
+        try:
+            cost = await collectors[service_name].get_current_month_cost_async()
+        except Exception:
+            breaker.record_failure()
+            COLLECTOR_ERRORS.labels(service_name, 'month_cost').inc()
+            raise
+    breaker.record_success()
+    _cost_cache[key] = cost
+    return cost
+
 @app.get("/")
 def root():
     return {
@@ -51,38 +139,101 @@ def health_check():
 # ============================================================================
 
 @app.get("/costs/current")
-def get_current_costs():
+async def get_current_costs(db: Session = Depends(get_db)):
     """Get current costs across all services"""
+    # Materialized path: the scheduler refreshes cost_snapshots every
+    # 15 min, so this is a single indexed SELECT with no provider I/O
+    snapshots = db.query(CostSnapshot).all()
+    if snapshots:
+        by_service = {s.service: s.amount for s in snapshots}
+        costs = {}
+        total = 0.0
+        for service_name in collectors:
+            if service_name in by_service:
+                costs[service_name] = by_service[service_name]
+                total += by_service[service_name]
+            else:
+                # Never refreshed successfully (missing key, provider
+                # down): keep the service visible instead of silently
+                # dropping it and making total look complete
+                costs[service_name] = {'error': 'no snapshot available'}
+        return {
+            'total': total,
+            'by_service': costs,
+            'currency': 'USD',
+            'period': 'current_month',
+            'last_updated': max(s.timestamp for s in snapshots).isoformat()
+        }
+
+    # Cold start (no snapshot yet): compute live, concurrently
     costs = {}
     total = 0.0
+    results = await asyncio.gather(
+        *[get_month_cost_cached(service_name) for service_name in collectors],
+        return_exceptions=True
+    )
 
-    for service_name, collector in collectors.items():
-        try:
-            cost = collector.get_current_month_cost()
-            costs[service_name] = cost
-            total += cost
-        except Exception as e:
-            costs[service_name] = {'error': str(e)}
+    for service_name, result in zip(collectors, results):
+        if isinstance(result, Exception):
+            costs[service_name] = {'error': str(result)}
+        else:
+            costs[service_name] = result
+            total += result
 
     return {
         'total': total,
         'by_service': costs,
         'currency': 'USD',
         'period': 'current_month',
-        'timestamp': datetime.now().isoformat()
+        'last_updated': datetime.now().isoformat()
     }
 
+async def refresh_cost_snapshots():
+    """Scheduled job: upsert each service's month cost into cost_snapshots"""
+    results = await asyncio.gather(
+        *[get_month_cost_cached(service_name) for service_name in collectors],
+        return_exceptions=True
+    )
+
+    db = SessionLocal()
+    try:
+        now = datetime.now()
+        for service_name, result in zip(collectors, results):
+            if isinstance(result, Exception):
+                # Keep the previous snapshot; stale beats missing
+                print(f"Error refreshing snapshot for {service_name}: {result}")
+                continue
+            snapshot = db.get(CostSnapshot, service_name)
+            if snapshot:
+                snapshot.amount = result
+                snapshot.timestamp = now
+            else:
+                db.add(CostSnapshot(service=service_name, amount=result, timestamp=now))
+        db.commit()
+    finally:
+        db.close()
+
+@app.post("/costs/refresh")
+async def refresh_costs():
+    """Re-fetch costs from the providers and rebuild the snapshot table"""
+    # /costs/current serves from cost_snapshots, so clearing the TTL
+    # cache alone would change nothing until the next scheduled run
+    _cost_cache.clear()
+    await refresh_cost_snapshots()
+    return {"message": "Cost cache cleared and snapshots refreshed"}
+
 @app.get("/costs/service/{service_name}")
 def get_service_cost(service_name: str):
     """Get detailed cost for a specific service"""
-    if service_name not in collectors:
+    if service_name not in SERVICES:
         raise HTTPException(status_code=404, detail=f"Service {service_name} not found")
 
     collector = collectors[service_name]
     try:
-        data = collector.get_usage()
-        return data
+        with COLLECTOR_SECONDS.labels(service_name, 'usage').time():
+            return collector.get_usage()
     except Exception as e:
+        COLLECTOR_ERRORS.labels(service_name, 'usage').inc()
         raise HTTPException(status_code=500, detail=str(e))
 
 # ============================================================================
@@ -90,9 +241,9 @@ def get_service_cost(service_name: str):
 # ============================================================================
 
 @app.get("/budgets")
-def get_budgets():
+def get_budgets(db: Session = Depends(get_db)):
     """Get all budget limits"""
-    budgets = session.query(BudgetLimit).all()
+    budgets = db.query(BudgetLimit).all()
     return [{
         'service': b.service,
         'monthly_limit': b.monthly_limit,
@@ -101,9 +252,11 @@ def get_budgets():
     } for b in budgets]
 
 @app.post("/budgets")
-def create_budget(service: str, monthly_limit: float, alert_threshold: float = 0.8, hard_limit: float = None):
+def create_budget(service: str, monthly_limit: float, alert_threshold: float = 0.8, hard_limit: float = None, db: Session = Depends(get_db)):
     """Create or update budget limit for a service"""
-    budget = session.query(BudgetLimit).filter_by(service=service).first()
+    budget = db.execute(
+        select(BudgetLimit).where(BudgetLimit.service == service)
+    ).scalar_one_or_none()
 
     if budget:
         budget.monthly_limit = monthly_limit
@@ -117,19 +270,33 @@ def create_budget(service: str, monthly_limit: float, alert_threshold: float = 0
             alert_threshold=alert_threshold,
             hard_limit=hard_limit
         )
-        session.add(budget)
+        db.add(budget)
 
-    session.commit()
+    db.commit()
+    _cost_cache.clear()
+    _budget_cache.clear()
     return {"message": "Budget updated", "service": service}
 
 @app.get("/budgets/status")
-def get_budget_status():
+async def get_budget_status(db: Session = Depends(get_db)):
     """Get budget status for all services"""
-    budgets = session.query(BudgetLimit).all()
+    budgets = db.query(BudgetLimit).all()
     status = []
 
-    for budget in budgets:
-        current_cost = collectors[budget.service].get_current_month_cost()
+    # One concurrent fan-out instead of a blocking provider call per
+    # budget; the TTL cache shares results with the other endpoints
+    costs = await asyncio.gather(
+        *[get_month_cost_cached(budget.service) for budget in budgets],
+        return_exceptions=True
+    )
+
+    for budget, current_cost in zip(budgets, costs):
+        if isinstance(current_cost, Exception):
+            status.append({
+                'service': budget.service,
+                'error': str(current_cost)
+            })
+            continue
         percent_used = (current_cost / budget.monthly_limit * 100) if budget.monthly_limit > 0 else 0
 
         alert_level = "ok"
@@ -154,12 +321,12 @@ def get_budget_status():
 # ============================================================================
 
 @app.get("/alerts")
-def get_alerts(limit: int = 50):
+def get_alerts(limit: int = 50, db: Session = Depends(get_db)):
     """Get recent alerts"""
-    alerts = session.query(Alert).order_by(Alert.timestamp.desc()).limit(limit).all()
+    alerts = db.query(Alert).order_by(Alert.timestamp.desc()).limit(limit).all()
     return [{
         'id': a.id,
-        'timestamp': a.timestamp.isoformat(),
+        'timestamp': a.timestamp,
         'service': a.service,
         'alert_type': a.alert_type,
         'severity': a.severity,
@@ -173,44 +340,69 @@ async def check_alerts(background_tasks: BackgroundTasks):
     background_tasks.add_task(run_alert_check)
     return {"message": "Alert check scheduled"}
 
-def run_alert_check():
+async def run_alert_check():
     """Run alert check for all services"""
-    budgets = session.query(BudgetLimit).all()
+    # Background job: not request-scoped, so it owns its session
+    db = SessionLocal()
+    try:
+        await _run_alert_check(db)
+    finally:
+        db.close()
+
+async def _run_alert_check(db: Session):
+    budgets = get_budgets_cached(db)
+
+    # Fetch all costs concurrently (shares the TTL cache with the
+    # endpoints); threshold evaluation below is pure in-memory work
+    costs = await asyncio.gather(
+        *[get_month_cost_cached(budget.service) for budget in budgets],
+        return_exceptions=True
+    )
 
-    for budget in budgets:
+    alerts = []
+    for budget, current_cost in zip(budgets, costs):
         try:
-            current_cost = collectors[budget.service].get_current_month_cost()
+            if isinstance(current_cost, Exception):
+                raise current_cost
             percent_used = (current_cost / budget.monthly_limit) if budget.monthly_limit > 0 else 0
 
             # Threshold alert
             if percent_used >= budget.alert_threshold:
-                create_alert(
+                alerts.append(create_alert(
                     service=budget.service,
                     alert_type='threshold',
                     severity='warning' if percent_used < 1.0 else 'critical',
                     message=f'{budget.service} has reached {percent_used*100:.1f}% of monthly budget',
                     current_cost=current_cost,
                     limit=budget.monthly_limit
-                )
+                ))
 
             # Hard limit
             if budget.hard_limit and current_cost >= budget.hard_limit:
-                create_alert(
+                alerts.append(create_alert(
                     service=budget.service,
                     alert_type='hard_limit',
                     severity='critical',
                     message=f'{budget.service} has exceeded hard limit!',
                     current_cost=current_cost,
                     limit=budget.hard_limit
-                )
+                ))
                 # TODO: Disable API access
 
         except Exception as e:
             print(f"Error checking alerts for {budget.service}: {e}")
 
-def create_alert(service: str, alert_type: str, severity: str, message: str, current_cost: float, limit: float = None):
-    """Create a new alert"""
-    alert = Alert(
+    # One commit for the whole run: SQLite pays one fsync per commit,
+    # so per-alert commits dominate the run time
+    if alerts:
+        db.bulk_save_objects(alerts)
+        db.commit()
+
+    # TODO: Send notifications via Slack/Discord
+
+def create_alert(service: str, alert_type: str, severity: str, message: str, current_cost: float, limit: float = None) -> Alert:
+    """Build a new alert; the caller is responsible for persisting it"""
+    return Alert(
         service=service,
         alert_type=alert_type,
         severity=severity,
@@ -218,37 +410,41 @@ def create_alert(service: str, alert_type: str, severity: str, message: str, cur
         current_cost=current_cost,
         limit=limit
     )
-    session.add(alert)
-    session.commit()
-
-    # TODO: Send notification via Slack/Discord
 
 # ============================================================================
 # Projections
 # ============================================================================
 
 @app.get("/projections/end-of-month")
-def get_projections():
+async def get_projections():
     """Project costs to end of month"""
     projections = {}
 
-    for service_name, collector in collectors.items():
-        try:
-            projection = collector.project_end_of_month()
-            projections[service_name] = projection
-        except:
+    results = await asyncio.gather(
+        *[asyncio.to_thread(_project_service, collector) for collector in collectors.values()],
+        return_exceptions=True
+    )
+
+    for service_name, result in zip(collectors, results):
+        if isinstance(result, Exception):
             projections[service_name] = {'error': 'Unable to project'}
+        else:
+            projections[service_name] = result
 
     return projections
 
+def _project_service(collector) -> Dict:
+    """Run a collector's projection (blocking; called via to_thread)"""
+    return collector.project_end_of_month()
+
 # ============================================================================
 # Optimizations
 # ============================================================================
 
 @app.get("/optimizations")
-def get_optimizations():
+def get_optimizations(db: Session = Depends(get_db)):
     """Get optimization suggestions"""
-    opts = session.query(Optimization).filter_by(status='pending').order_by(Optimization.potential_savings.desc()).all()
+    opts = db.query(Optimization).filter_by(status='pending').order_by(Optimization.potential_savings.desc()).all()
     return [{
         'id': o.id,
         'service': o.service,
@@ -259,15 +455,17 @@ def get_optimizations():
     } for o in opts]
 
 @app.post("/optimizations/{opt_id}/apply")
-def apply_optimization(opt_id: int):
+def apply_optimization(opt_id: int, db: Session = Depends(get_db)):
     """Mark optimization as applied"""
-    opt = session.query(Optimization).filter_by(id=opt_id).first()
+    # Session.get checks the identity map and uses the prepared PK
+    # lookup path, skipping query compilation
+    opt = db.get(Optimization, opt_id)
     if not opt:
         raise HTTPException(status_code=404, detail="Optimization not found")
 
     opt.status = 'applied'
     opt.applied_at = datetime.now()
-    session.commit()
+    db.commit()
 
     return {"message": "Optimization marked as applied"}
 
@@ -276,36 +474,36 @@ def apply_optimization(opt_id: int):
 # ============================================================================
 
 @app.get("/history")
-def get_history(service: str = None, days: int = 30):
-    """Get historical cost data"""
+def get_history(service: str = None, days: int = 30, limit: int = Query(500, ge=1, le=5000), after: datetime = None, db: Session = Depends(get_db)):
+    """Get historical cost data, paginated by timestamp cursor"""
     start_date = datetime.now() - timedelta(days=days)
 
-    query = session.query(CostRecord).filter(CostRecord.timestamp >= start_date)
+    # Column-only select: returns plain tuples of the four fields the
+    # response needs, skipping ORM materialization and the JSON blob
+    stmt = select(
+        CostRecord.timestamp, CostRecord.service,
+        CostRecord.amount, CostRecord.category
+    ).where(CostRecord.timestamp >= start_date)
 
     if service:
-        query = query.filter(CostRecord.service == service)
-
-    records = query.order_by(CostRecord.timestamp).all()
-
-    return [{
-        'timestamp': r.timestamp.isoformat(),
-        'service': r.service,
-        'amount': r.amount,
-        'category': r.category
-    } for r in records]
+        stmt = stmt.where(CostRecord.service == service)
+    if after:
+        # Keyset pagination: seeking past the cursor uses the
+        # timestamp index instead of an OFFSET scan over skipped rows
+        stmt = stmt.where(CostRecord.timestamp > after)
 
-# ============================================================================
-# Scheduled Jobs
-# ============================================================================
+    rows = db.execute(stmt.order_by(CostRecord.timestamp).limit(limit)).all()
 
-@app.on_event("startup")
-async def startup_event():
-    """Initialize scheduled jobs"""
-    # TODO: Use APScheduler for:
-    # - Hourly cost collection
-    # - Daily alerts check
-    # - Weekly optimization analysis
-    pass
+    # Raw datetimes are fine, ORJSONResponse encodes them natively
+    return {
+        'items': [{
+            'timestamp': timestamp,
+            'service': svc,
+            'amount': amount,
+            'category': category
+        } for timestamp, svc, amount, category in rows],
+        'next_cursor': rows[-1].timestamp.isoformat() if rows and len(rows) == limit else None
+    }
 
 if __name__ == "__main__":
     import uvicorn
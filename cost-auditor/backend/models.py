@@ -1,23 +1,29 @@
 """
 Database models for Cost Auditor
 """
+import os
 from datetime import datetime
-from sqlalchemy import create_engine, Column, Integer, Float, String, DateTime, JSON
+from sqlalchemy import create_engine, Column, Integer, Float, String, DateTime, JSON, Boolean, Index, event
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, deferred
 
 Base = declarative_base()
 
 class CostRecord(Base):
     """Historical cost records"""
     __tablename__ = 'cost_records'
+    # Composite index matches the /history access path:
+    # WHERE service = ? AND timestamp >= ? ORDER BY timestamp
+    __table_args__ = (Index('ix_cost_service_ts', 'service', 'timestamp'),)
 
     id = Column(Integer, primary_key=True)
     timestamp = Column(DateTime, default=datetime.utcnow, index=True)
     service = Column(String(50), index=True)  # anthropic, gcp, elevenlabs, etc
     category = Column(String(50))  # compute, storage, api_calls, etc
     amount = Column(Float)  # Cost in USD
-    usage_details = Column(JSON)  # Details about usage
+    # Deferred: the JSON blob is only loaded on explicit access, so
+    # bulk reads like /history don't drag it through the ORM
+    usage_details = deferred(Column(JSON))  # Details about usage
     project = Column(String(100), nullable=True)
     user_id = Column(String(100), nullable=True)
 
@@ -36,6 +42,7 @@ class BudgetLimit(Base):
 class Alert(Base):
     """Cost alerts log"""
     __tablename__ = 'alerts'
+    __table_args__ = (Index('ix_alert_service_ts', 'service', 'timestamp'),)
 
     id = Column(Integer, primary_key=True)
     timestamp = Column(DateTime, default=datetime.utcnow, index=True)
@@ -45,7 +52,15 @@ class Alert(Base):
     message = Column(String(500))
     current_cost = Column(Float)
     limit = Column(Float, nullable=True)
-    notified = Column(Integer, default=0)  # Boolean for notification sent
+    notified = Column(Boolean, default=False)  # Notification sent
+
+# Partial index over pending notifications only: the "find unnotified
+# alerts" query stays O(log K) in the pending count, not the table size
+Index(
+    'ix_alert_unnotified', Alert.timestamp,
+    sqlite_where=~Alert.notified,
+    postgresql_where=~Alert.notified,
+)
 
 class UsageMetric(Base):
     """Detailed usage metrics"""
@@ -57,7 +72,16 @@ class UsageMetric(Base):
     metric_name = Column(String(100))  # tokens, requests, compute_minutes, etc
     metric_value = Column(Float)
     cost_per_unit = Column(Float, nullable=True)
-    metadata = Column(JSON)
+    # 'metadata' is reserved by SQLAlchemy's declarative base
+    extra_data = Column('metadata', JSON)
+
+class CostSnapshot(Base):
+    """Materialized per-service month cost, refreshed by the scheduler"""
+    __tablename__ = 'cost_snapshots'
+
+    service = Column(String(50), primary_key=True)
+    timestamp = Column(DateTime, default=datetime.utcnow)  # Last refresh
+    amount = Column(Float)  # Current-month cost in USD
 
 class Optimization(Base):
     """Optimization suggestions"""
@@ -74,12 +98,40 @@ class Optimization(Base):
     applied_at = Column(DateTime, nullable=True)
 
 # Database setup
-def init_db(db_path='sqlite:////data/cost_auditor.db'):
-    """Initialize database"""
-    engine = create_engine(db_path, echo=False)
+def init_db(db_path=None):
+    """Initialize database and return the engine"""
+    if db_path is None:
+        db_path = os.getenv('COST_AUDITOR_DB', 'sqlite:////data/cost_auditor.db')
+
+    is_sqlite = db_path.startswith('sqlite')
+    connect_args = {'check_same_thread': False} if is_sqlite else {}
+    engine = create_engine(db_path, echo=False, connect_args=connect_args)
+
+    if is_sqlite:
+        # WAL lets concurrent readers proceed during writes;
+        # synchronous=NORMAL is per-connection, hence the connect hook
+        @event.listens_for(engine, 'connect')
+        def _set_sqlite_pragmas(dbapi_conn, _record):
+            cursor = dbapi_conn.cursor()
+            cursor.execute('PRAGMA journal_mode=WAL')
+            cursor.execute('PRAGMA synchronous=NORMAL')
+            cursor.close()
+
     Base.metadata.create_all(engine)
-    Session = sessionmaker(bind=engine)
-    return Session()
+    # create_all skips indexes on tables that already exist, so make
+    # sure the composite indexes land on databases created before them
+    for table in Base.metadata.tables.values():
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
+    return engine
+
+engine = init_db()
+SessionLocal = sessionmaker(bind=engine, expire_on_commit=False)
 
-# Create session
-session = init_db()
+def get_db():
+    """FastAPI dependency yielding a request-scoped session"""
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()